@@ -16,3 +16,9 @@ cp /rnnoise/librnnoise_ladspa.so /backend/out/
 
 # Copy psutil for process management
 cp -r /psutil /backend/out/
+
+# Copy python-xlib for display resolution detection
+cp -r /xlib /backend/out/
+
+# Copy msgpack for the settings file format
+cp -r /msgpack /backend/out/
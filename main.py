@@ -5,9 +5,11 @@ import subprocess
 import signal
 import time
 import json
+import re
+import shlex
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urlparse
-from settings import SettingsManager
 import decky_plugin
 import logging
 from logging.handlers import RotatingFileHandler
@@ -71,43 +73,124 @@ try:
 except Exception:
     logger.info(traceback.format_exc())
 
+try:
+    sys.path = [str(DEPSPATH / "xlib")] + sys.path
+    from Xlib import display as xdisplay
+    logger.info("Successfully loaded python-xlib")
+except Exception:
+    xdisplay = None
+    logger.info("python-xlib not available, using xrandr for display detection")
+
+# Bundled msgpack must be on sys.path before settings is imported; without it settings stay JSON
+sys.path = [str(DEPSPATH / "msgpack")] + sys.path
+from settings import SettingsManager
+
+
+def _read_cmdline(pid):
+    """Raw NUL-separated cmdline bytes of pid, or b"" if it is gone or unreadable."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read()
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        return b""
+
+
+def _iter_cmdlines():
+    """Yield (pid, raw cmdline bytes) for every process, straight from /proc."""
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            yield int(name), _read_cmdline(name)
+
 
 def find_gst_processes():
-    pids = []
-    for child in psutil.process_iter():
-        try:
-            if "Decky-Streamer" in " ".join(child.cmdline()):
-                pids.append(child.pid)
-        except psutil.NoSuchProcess:
-            pass
-    return pids
+    """Pids of gst-launch processes capturing from our streaming sink."""
+    return [
+        pid for pid, cmdline in _iter_cmdlines()
+        if b"gst-launch-1.0" in cmdline and b"Decky-Streaming-Sink.monitor" in cmdline
+    ]
+
+
+_gamescope_pid = None
 
 
 def in_gamemode():
-    for child in psutil.process_iter():
+    """True if gamescope-session is running; re-checks the last known pid before scanning /proc."""
+    global _gamescope_pid
+    if _gamescope_pid is not None and b"gamescope-session" in _read_cmdline(_gamescope_pid):
+        return True
+    for pid, cmdline in _iter_cmdlines():
+        if b"gamescope-session" in cmdline:
+            _gamescope_pid = pid
+            return True
+    _gamescope_pid = None
+    return False
+
+
+def signal_process_group(proc, sig):
+    """Signal the whole session gst was started in (start_new_session=True), not just its pid."""
+    try:
+        os.killpg(os.getpgid(proc.pid), sig)
+    except (ProcessLookupError, OSError):
         try:
-            if "gamescope-session" in " ".join(child.cmdline()):
-                return True
-        except psutil.NoSuchProcess:
+            proc.send_signal(sig)
+        except (ProcessLookupError, OSError):
             pass
-    return False
 
 
-def get_cmd_output(cmd, log=True):
-    if log:
-        logger.debug(f"Command: {cmd}")
-    # Clear LD_LIBRARY_PATH to avoid conflicts with system libraries
-    env = os.environ.copy()
-    env.pop('LD_LIBRARY_PATH', None)
-    env.pop('LD_PRELOAD', None)
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, env=env)
-    return (result.stdout + result.stderr).strip()
+def read_wakeup_count():
+    with open("/sys/power/wakeup_count", "rb") as f:
+        return int(f.read())
+
+
+_CLEAN_ENV = None
+_STREAM_ENV = None
+
+
+def _clean_env():
+    """os.environ without the plugin loader's library overrides, built once and shared.
+
+    Callers must not mutate the returned dict; go through set_environ() to change
+    the process environment so the cache is rebuilt.
+    """
+    global _CLEAN_ENV
+    if _CLEAN_ENV is None:
+        # Clear LD_LIBRARY_PATH to avoid conflicts with system libraries
+        _CLEAN_ENV = {k: v for k, v in os.environ.items() if k not in ("LD_LIBRARY_PATH", "LD_PRELOAD")}
+    return _CLEAN_ENV
+
+
+def set_environ(**values):
+    """Update os.environ and invalidate the cached subprocess environments."""
+    global _CLEAN_ENV, _STREAM_ENV
+    changed = False
+    for key, value in values.items():
+        if os.environ.get(key) != value:
+            os.environ[key] = value
+            changed = True
+    if changed:
+        _CLEAN_ENV = None
+        _STREAM_ENV = None
+
+
+def run_args(argv, *, env=None):
+    """Run argv directly (no shell) with a clean environment."""
+    logger.debug(f"Command: {shlex.join(argv)}")
+    return subprocess.run(argv, capture_output=True, text=True, env=env or _clean_env())
+
+
+def _pactl(args):
+    """Run pactl directly (no shell) and return its stdout."""
+    return run_args(["pactl", *args]).stdout
 
 
 def unload_pa_modules(search_string):
-    module_list = get_cmd_output(f"pactl list short modules | grep '{search_string}' | awk '{{print $1}}'").split("\n")
-    for module_id in module_list:
-        get_cmd_output(f"pactl unload-module {module_id}")
+    module_ids = [
+        line.split("\t", 1)[0]
+        for line in _pactl(["list", "short", "modules"]).splitlines()
+        if search_string in line
+    ]
+    for module_id in module_ids:
+        _pactl(["unload-module", module_id])
 
 
 # Streaming platform presets
@@ -161,18 +244,21 @@ def _sanitize_rtmp_url(url: str):
     }
 
 
+def _tail(path: Path, size: int = 65536):
+    """Read at most the last size bytes of a file as text."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - size))
+        return f.read().decode("utf-8", errors="ignore")
+
+
 def _tail_text(path: Path, line_count: int = 40):
     """Read a small tail chunk from a log file."""
     try:
         if not path.exists():
             return ""
-        with open(path, "rb") as f:
-            f.seek(0, os.SEEK_END)
-            end = f.tell()
-            read_size = min(end, 32768)
-            f.seek(end - read_size)
-            data = f.read().decode("utf-8", errors="ignore")
-        lines = data.splitlines()
+        lines = _tail(path, 32768).splitlines()
         return "\n".join(lines[-line_count:])
     except Exception:
         return ""
@@ -185,6 +271,32 @@ def _is_pipewire_stream_error(stderr_tail: str):
     return "gstpipewiresrc" in s and "reason error (-5)" in s
 
 
+# Lowercase substrings that mark a GStreamer stderr line as an error worth surfacing.
+STDERR_ERROR_INDICATORS = (
+    "connection refused",
+    "could not connect",
+    "connection reset",
+    "broken pipe",
+    "timed out",
+    "erroneous pipeline",
+    "no element",
+    "internal data stream error",
+    "could not open resource",
+    "error:",
+)
+
+
+_STDERR_ERROR_RE = re.compile("|".join(map(re.escape, STDERR_ERROR_INDICATORS)), re.IGNORECASE)
+
+
+def _stderr_error_match(line: str):
+    return _STDERR_ERROR_RE.search(line) is not None
+
+
+# What get_stream_key returns in place of a configured key
+MASKED_STREAM_KEY = "*" * 8
+
+
 RTMP_MISSING_MESSAGE = (
     "RTMP plugin not available (missing librtmp). "
     "On SteamOS: open Konsole and run: sudo steamos-readonly disable && sudo pacman -S rtmpdump && sudo steamos-readonly enable"
@@ -192,17 +304,28 @@ RTMP_MISSING_MESSAGE = (
 
 
 def _streaming_env():
-    """Build env for GStreamer subprocess: use plugin's bin for libs (e.g. librtmp)."""
-    env = os.environ.copy()
-    env.pop("LD_PRELOAD", None)
-    # Prepend plugin bin so bundled librtmp (and other deps) are found when loading libgstrtmp
-    env["LD_LIBRARY_PATH"] = str(DEPSPATH)
-    env["GST_PLUGIN_PATH"] = str(GSTPLUGINSPATH)
-    return env
+    """Env for GStreamer subprocesses: use plugin's bin for libs (e.g. librtmp). Shared; do not mutate."""
+    global _STREAM_ENV
+    if _STREAM_ENV is None:
+        env = {k: v for k, v in os.environ.items() if k != "LD_PRELOAD"}
+        # Prepend plugin bin so bundled librtmp (and other deps) are found when loading libgstrtmp
+        env["LD_LIBRARY_PATH"] = str(DEPSPATH)
+        env["GST_PLUGIN_PATH"] = str(GSTPLUGINSPATH)
+        _STREAM_ENV = env
+    return _STREAM_ENV
+
+
+# A positive rtmpsink check holds for the plugin's lifetime; a negative one is
+# retried after a short TTL so installing rtmpdump does not need a restart.
+_RTMPSINK_CACHE = {"ok": None, "ts": 0.0}
+_RTMPSINK_NEGATIVE_TTL = 30
 
 
 def _check_rtmpsink_available():
     """Return True if GStreamer rtmpsink element is available (librtmp loaded)."""
+    ok = _RTMPSINK_CACHE["ok"]
+    if ok is True or (ok is False and time.time() - _RTMPSINK_CACHE["ts"] < _RTMPSINK_NEGATIVE_TTL):
+        return ok
     env = _streaming_env()
     result = subprocess.run(
         ["gst-inspect-1.0", "rtmpsink"],
@@ -211,7 +334,14 @@ def _check_rtmpsink_available():
         text=True,
         timeout=5,
     )
-    return result.returncode == 0
+    _RTMPSINK_CACHE["ok"] = result.returncode == 0
+    _RTMPSINK_CACHE["ts"] = time.time()
+    return _RTMPSINK_CACHE["ok"]
+
+
+def clear_rtmpsink_cache():
+    _RTMPSINK_CACHE["ok"] = None
+    _RTMPSINK_CACHE["ts"] = 0.0
 
 
 _GST_INSPECT_CACHE = {}
@@ -250,6 +380,11 @@ def _gst_element_has_property(element: str, prop: str):
     return False
 
 
+def _as_int(value):
+    """Coerce a UI-supplied number to int, skipping the conversion when it already is one."""
+    return value if type(value) is int else int(value)
+
+
 def get_video_scale_caps(resolution):
     """Get the video scaling caps filter based on resolution preset"""
     preset = RESOLUTION_PRESETS.get(resolution, RESOLUTION_PRESETS["720p"])
@@ -258,40 +393,148 @@ def get_video_scale_caps(resolution):
     return f"video/x-raw,width={preset['width']},height={preset['height']}"
 
 
+X11_SOCKET_DIR = Path("/tmp/.X11-unix")
+# The socket directory's mtime changes whenever an X server creates or removes
+# its socket, so it is a cheap invalidation key for the cached listing.
+_X11_SOCKETS_CACHE = {"mtime": None, "sockets": []}
+
+
+def list_x11_sockets():
+    """Return the X11 socket names (e.g. X0, X1), re-listing only when the directory changed."""
+    try:
+        mtime = X11_SOCKET_DIR.stat().st_mtime_ns
+    except OSError:
+        clear_display_cache()
+        return []
+    if mtime != _X11_SOCKETS_CACHE["mtime"]:
+        try:
+            sockets = sorted(os.listdir(X11_SOCKET_DIR))
+        except OSError:
+            sockets = []
+        _X11_SOCKETS_CACHE["mtime"] = mtime
+        _X11_SOCKETS_CACHE["sockets"] = sockets
+    return _X11_SOCKETS_CACHE["sockets"]
+
+
+def clear_display_cache():
+    _X11_SOCKETS_CACHE["mtime"] = None
+    _X11_SOCKETS_CACHE["sockets"] = []
+
+
+def _xlib_display_resolution(display):
+    """Return (width, height) of the first active RandR CRTC on display, or None."""
+    d = xdisplay.Display(display)
+    try:
+        resources = d.screen().root.xrandr_get_screen_resources()
+        for crtc in resources.crtcs:
+            info = d.xrandr_get_crtc_info(crtc, resources.config_timestamp)
+            if info.mode:
+                return info.width, info.height
+    finally:
+        d.close()
+    return None
+
+
+PIPELINE_URL_PLACEHOLDER = "$URL"
+
+
+def build_gst_pipeline(
+    resolution, fps, video_kbps, keyframe_interval, bframes, audio_kbps, capture_backend, software_encoder, sink_name
+):
+    """Build the gst-launch pipeline description with PIPELINE_URL_PLACEHOLDER in place of the RTMP URL.
+
+    Returns (encoder, encoder_opts, pipeline).
+    """
+    encoder = "vaapih264enc"
+    encoder_opts = f"bitrate={video_kbps}"
+    if keyframe_interval > 0:
+        encoder_opts += f" keyframe-period={keyframe_interval}"
+    if bframes > 0:
+        encoder_opts += f" max-bframes={bframes}"
+
+    # After repeated RTMP disconnects, switch to software encoder for safer timestamps.
+    if software_encoder or not _gst_has_element("vaapih264enc"):
+        encoder = "x264enc" if _gst_has_element("x264enc") else "vaapih264enc"
+        if encoder == "x264enc":
+            keyint = keyframe_interval if keyframe_interval > 0 else fps
+            encoder_opts = (
+                f"bitrate={video_kbps} tune=zerolatency speed-preset=veryfast "
+                f"key-int-max={max(1, keyint)} bframes=0"
+            )
+
+    video_source = "pipewiresrc do-timestamp=true"
+    if capture_backend == "ximagesrc":
+        video_source = "ximagesrc use-damage=0 show-pointer=false do-timestamp=true"
+
+    # Video pipeline using pipewiresrc (from working script)
+    # Using rtmpsink instead of rtmp2sink, simpler vaapih264enc config
+    scale_caps = get_video_scale_caps(resolution)
+    if scale_caps:
+        convert = f"videoconvert ! videoscale ! videorate ! {scale_caps},framerate={fps}/1"
+    else:
+        convert = f"videoconvert ! videorate ! video/x-raw,framerate={fps}/1"
+
+    video_pipeline = (
+        f"{video_source} ! "
+        f"{convert} ! "
+        f"queue max-size-buffers=120 max-size-bytes=0 max-size-time=0 ! "
+        f"{encoder} {encoder_opts} ! "
+        f"h264parse config-interval=1 ! "
+        f"queue max-size-buffers=120 max-size-bytes=0 max-size-time=0 ! "
+        f"{'h264timestamper ! ' if _gst_has_element('h264timestamper') else ''}"
+        f"flvmux name=mux streamable=true "
+        f"{'enforce-increasing-timestamps=true ' if _gst_element_has_property('flvmux', 'enforce-increasing-timestamps') else ''}"
+        f"{'skip-backwards-streams=true ' if _gst_element_has_property('flvmux', 'skip-backwards-streams') else ''}"
+        f"! rtmpsink location=\"{PIPELINE_URL_PLACEHOLDER}\" sync=false async=false"
+    )
+
+    # Audio pipeline - AAC encoded for RTMP
+    audio_pipeline = (
+        f'pulsesrc device="{sink_name}.monitor" ! '
+        f'audio/x-raw,channels=2 ! audioconvert ! '
+        f'avenc_aac bitrate={audio_kbps * 1000} ! '
+        f'mux.'
+    )
+    return encoder, encoder_opts, f"{video_pipeline} {audio_pipeline}"
+
+
 def detect_display_resolution():
-    """Detect the current display resolution using xrandr"""
+    """Detect the current display resolution using RandR (python-xlib) or xrandr"""
     # Try displays in order: :0 (works when docked), :1 (game display in handheld)
     displays_to_try = [":0", ":1"]
     
     for display in displays_to_try:
+        if xdisplay is not None:
+            try:
+                res = _xlib_display_resolution(display)
+                if res:
+                    return {"width": res[0], "height": res[1], "display": display}
+            except Exception as e:
+                logger.debug(f"RandR query failed on {display}: {e}")
+
         try:
-            env = os.environ.copy()
-            env.pop('LD_LIBRARY_PATH', None)
-            env.pop('LD_PRELOAD', None)
-            env['DISPLAY'] = display
+            env = {**_clean_env(), 'DISPLAY': display}
             
-            # Try xrandr first
-            result = subprocess.run(
-                "xrandr | grep '*' | awk '{print $1}'",
-                shell=True, capture_output=True, text=True, env=env
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                # Parse resolution like "1280x800"
-                res = result.stdout.strip().split('\n')[0]
-                if 'x' in res:
-                    width, height = res.split('x')
-                    return {"width": int(width), "height": int(height), "display": display}
+            # Try xrandr first; the active mode is the line marked with '*'
+            result = run_args(["xrandr"], env=env)
+            if result.returncode == 0:
+                for line in result.stdout.splitlines():
+                    if "*" in line:
+                        # Parse resolution like "1280x800"
+                        res = line.split()[0]
+                        if 'x' in res:
+                            width, height = res.split('x')
+                            return {"width": int(width), "height": int(height), "display": display}
+                        break
             
             # Fallback to xdpyinfo
-            result = subprocess.run(
-                "xdpyinfo | grep dimensions | awk '{print $2}'",
-                shell=True, capture_output=True, text=True, env=env
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                res = result.stdout.strip()
-                if 'x' in res:
-                    width, height = res.split('x')
-                    return {"width": int(width), "height": int(height), "display": display}
+            result = run_args(["xdpyinfo"], env=env)
+            if result.returncode == 0:
+                for line in result.stdout.splitlines():
+                    fields = line.split()
+                    if fields and fields[0] == "dimensions:" and len(fields) > 1 and 'x' in fields[1]:
+                        width, height = fields[1].split('x')
+                        return {"width": int(width), "height": int(height), "display": display}
         except Exception as e:
             logger.debug(f"Could not detect display resolution on {display}: {e}")
     
@@ -299,6 +542,17 @@ def detect_display_resolution():
     return {"width": 1280, "height": 800, "display": "default"}
 
 
+# Watchdog poll interval (seconds) while streaming, and the cap it backs off to while idle
+WATCHDOG_INTERVAL = 2
+WATCHDOG_IDLE_MAX_INTERVAL = 15
+
+# Quiet period (seconds) after the last setter call before settings are written
+SAVE_DEBOUNCE_SECONDS = 0.5
+
+# How long (seconds) get_detected_resolution reuses its last answer
+DETECTED_RESOLUTION_TTL = 2.0
+
+
 class Plugin:
     _streaming_process = None
     _platform: str = "twitch"  # twitch, youtube, kick, facebook, custom
@@ -313,6 +567,7 @@ class Plugin:
             return RTMP_MISSING_MESSAGE
         return ""
     _rtmpUrl: str = ""
+    _effective_rtmp_url: str = PLATFORM_URLS["twitch"]
     _customRtmpUrl: str = ""
     _streamKey: str = ""
     _videoBitrate: int = 4500  # kbps - good for 720p60
@@ -332,14 +587,21 @@ class Plugin:
     _legacy_denoise_binary_path = decky_plugin.DECKY_USER_HOME + "/homebrew/data/decky-streamer/librnnoise_ladspa.so"
     _bundled_denoise_binary_path = str(DEPSPATH / "librnnoise_ladspa.so")
     _watchdog_task = None
+    _watchdog_wake = None
+    _watchdog_interval: float = WATCHDOG_INTERVAL
+    _executor = None
+    _pa_executor = None
+    _save_lock = None
     _wakeup_count = 1
     _settings = None
     _stream_start_time = None
     _stream_error: bool = False
     _last_error_message: str = ""
     _stream_session_id: str = ""
-    _stderr_last_mtime: float = 0.0
+    _stderr_pump_task = None
+    _last_stderr_error: str = ""
     _watchdog_tick: int = 0
+    _health_proc = None
     _user_requested_stop: bool = False
     _recovery_pending: bool = False
     _capture_backend_preference: str = "pipewire"  # pipewire | ximagesrc
@@ -353,6 +615,11 @@ class Plugin:
     _last_rtmp_disconnect_at: float = 0.0
     _force_software_encoder: bool = False
     _effective_fps_override: int = 0
+    _cached_pipeline_key = None
+    _cached_pipeline = None
+    _save_handle = None
+    _load_task = None
+    _detected_resolution_cache = (0.0, None)
     
 
     async def get_wakeup_count(self):
@@ -367,7 +634,10 @@ class Plugin:
         for pid in gst_pids:
             if pid != curr_pid:
                 logger.info(f"Killing rogue process {pid}")
-                os.kill(pid, signal.SIGKILL)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
 
     def _clear_reconnect_state(self):
         self._reconnect_active = False
@@ -408,14 +678,87 @@ class Plugin:
         )
         return True
 
+    async def _stderr_pump(self, proc, offset: int):
+        """Follow the gst stderr log from offset while proc runs, logging new lines as they arrive."""
+        session_id = self._stream_session_id
+        pending = b""
+
+        def handle(lines):
+            decoded = [line.decode("utf-8", errors="ignore").rstrip() for line in lines]
+            decoded = [line for line in decoded if line]
+            if not decoded:
+                return
+            logger.info(f"[stream:{session_id}] stderr:\n" + "\n".join(decoded))
+            for line in decoded:
+                if _stderr_error_match(line):
+                    self._last_stderr_error = line[:200]
+
+        try:
+            with open(std_err_file_path, "rb") as f:
+                f.seek(offset)
+                while True:
+                    # Check for exit before reading so output written just before it is not lost
+                    exited = proc.poll() is not None
+                    chunk = f.read()
+                    if chunk:
+                        lines = (pending + chunk).split(b"\n")
+                        pending = lines.pop()
+                        handle(lines)
+                    if exited:
+                        break
+                    if not chunk:
+                        await asyncio.sleep(0.25)
+            # A last line without a trailing newline is still worth logging
+            handle([pending])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"[stream:{session_id}] stderr pump stopped: {e}")
+
+    def _stop_stderr_pump(self):
+        if self._stderr_pump_task is not None:
+            self._stderr_pump_task.cancel()
+            self._stderr_pump_task = None
+
+    def _pipeline_template(self, fps, capture_backend):
+        """Return (encoder, encoder_opts, pipeline template), rebuilt only when its inputs change."""
+        key = (
+            self._resolution, fps, self._videoBitrate, self._keyframeInterval, self._bframes,
+            self._audioBitrate, capture_backend, self._force_software_encoder, self._deckySinkModuleName,
+        )
+        if key != self._cached_pipeline_key:
+            self._cached_pipeline = build_gst_pipeline(*key)
+            self._cached_pipeline_key = key
+        return self._cached_pipeline
+
+    def _wake_watchdog(self):
+        if self._watchdog_wake is not None:
+            self._watchdog_wake.set()
+
+    async def _watchdog_sleep(self):
+        """Wait for the next watchdog tick, backing off while idle; start/stop wake it early."""
+        busy = self._streaming_process is not None or self._recovery_pending or self._reconnect_active
+        if busy:
+            self._watchdog_interval = WATCHDOG_INTERVAL
+        try:
+            await asyncio.wait_for(self._watchdog_wake.wait(), timeout=self._watchdog_interval)
+            self._watchdog_interval = WATCHDOG_INTERVAL
+        except asyncio.TimeoutError:
+            if not busy:
+                self._watchdog_interval = min(self._watchdog_interval * 1.5, WATCHDOG_IDLE_MAX_INTERVAL)
+        self._watchdog_wake.clear()
+
     async def watchdog(self):
         logger.info("Watchdog started")
         while True:
             try:
                 self._watchdog_tick += 1
-                in_gm = in_gamemode()
+                # Check game mode on the worker pool while is_streaming runs on the loop.
                 # For watchdog decisions, only treat an active gst process as "streaming".
-                is_streaming = await Plugin.is_streaming(self, verbose=False, include_reconnect=False)
+                in_gm, is_streaming = await asyncio.gather(
+                    asyncio.get_event_loop().run_in_executor(self._executor, in_gamemode),
+                    Plugin.is_streaming(self, verbose=False, include_reconnect=False),
+                )
                 
                 # Stop streaming if we leave game mode
                 if not in_gm and is_streaming:
@@ -437,39 +780,30 @@ class Plugin:
                         Plugin._schedule_reconnect(self, "Reconnect attempt failed")
                     continue
                 
-                # Check for process crash/exit (is_streaming already handles this, 
-                # but we also want to check stderr for connection errors)
+                # Check for process crash/exit (is_streaming already handles this;
+                # stderr is followed by the _stderr_pump task)
                 if self._streaming_process is not None:
                     # Periodically capture process health and stderr tail for postmortem diagnostics.
                     if self._watchdog_tick % 5 == 0:
                         try:
-                            proc = psutil.Process(self._streaming_process.pid)
-                            cpu_pct = proc.cpu_percent(interval=None)
-                            rss_mb = round(proc.memory_info().rss / (1024 * 1024), 1)
+                            # Keep one Process per stream: cpu_percent() is measured since the previous call.
+                            proc = self._health_proc
+                            if proc is None or proc.pid != self._streaming_process.pid:
+                                proc = self._health_proc = psutil.Process(self._streaming_process.pid)
+                            with proc.oneshot():
+                                cpu_pct = proc.cpu_percent(interval=None)
+                                rss_mb = round(proc.memory_info().rss / (1024 * 1024), 1)
                             logger.info(
                                 f"[stream:{self._stream_session_id}] health pid={proc.pid} cpu={cpu_pct:.1f}% rss={rss_mb}MB"
                             )
                         except Exception as proc_err:
                             logger.debug(f"[stream:{self._stream_session_id}] health sample failed: {proc_err}")
 
-                    try:
-                        if std_err_file_path.exists():
-                            mtime = std_err_file_path.stat().st_mtime
-                            if mtime > self._stderr_last_mtime:
-                                self._stderr_last_mtime = mtime
-                                tail = _tail_text(std_err_file_path, line_count=12)
-                                if tail:
-                                    logger.info(
-                                        f"[stream:{self._stream_session_id}] stderr tail update:\n{tail}"
-                                    )
-                    except Exception as e:
-                        logger.debug(f"[stream:{self._stream_session_id}] Error checking stderr tail: {e}")
-                    
             except Exception as e:
                 logger.exception(f"Watchdog exception! {str(e)}")
 
             # Restart streaming on sleep wake up to resolve issues
-            wakeup_count = int(get_cmd_output("cat /sys/power/wakeup_count", log=False))
+            wakeup_count = read_wakeup_count()
             prev_wakeup_count = await Plugin.get_wakeup_count(self)
             
             if wakeup_count > prev_wakeup_count + 1:
@@ -480,12 +814,14 @@ class Plugin:
                     await Plugin.start_streaming(self)
                 await Plugin.set_wakeup_count(self, wakeup_count)
 
-            await asyncio.sleep(2)
+            await Plugin._watchdog_sleep(self)
 
     async def start_streaming(self):
         """Start the RTMP streaming process"""
+        await Plugin._ensure_loaded(self)
         try:
             logger.info("Starting stream")
+            Plugin._wake_watchdog(self)
             self._user_requested_stop = False
             self._recovery_pending = False
             
@@ -505,21 +841,23 @@ class Plugin:
 
             await Plugin.clear_rogue_gst_processes(self)
 
-            os.environ["XDG_RUNTIME_DIR"] = "/run/user/1000"
-            os.environ["XDG_SESSION_TYPE"] = "wayland"
-            os.environ["HOME"] = decky_plugin.DECKY_USER_HOME
+            set_environ(
+                XDG_RUNTIME_DIR="/run/user/1000",
+                XDG_SESSION_TYPE="wayland",
+                HOME=decky_plugin.DECKY_USER_HOME,
+            )
             
             # Find the correct DISPLAY for gamescope
             # Gamescope typically creates :1 for the nested X server where games run
             # Check which displays are available
-            display_check = get_cmd_output("ls /tmp/.X11-unix/ 2>/dev/null")
-            logger.info(f"Available X displays: {display_check}")
+            x11_sockets = list_x11_sockets()
+            logger.info(f"Available X displays: {' '.join(x11_sockets)}")
             
             # Build list of displays to try - prefer :1 (game content) then :0 (Steam UI)
             displays_to_try = []
-            if "X1" in display_check:
+            if "X1" in x11_sockets:
                 displays_to_try.append(":1")
-            if "X0" in display_check:
+            if "X0" in x11_sockets:
                 displays_to_try.append(":0")
             if not displays_to_try:
                 displays_to_try = [":0"]  # Default fallback
@@ -528,7 +866,7 @@ class Plugin:
             
             # Use the first available display (prefer :1 for game content)
             display_to_use = displays_to_try[0]
-            os.environ["DISPLAY"] = display_to_use
+            set_environ(DISPLAY=display_to_use)
             logger.info(f"Using DISPLAY={display_to_use}")
 
             # Build the full RTMP URL
@@ -560,24 +898,9 @@ class Plugin:
                 self._last_error_message = RTMP_MISSING_MESSAGE
                 return False
 
-            # Get video scaling
-            scale_caps = get_video_scale_caps(self._resolution)
-            
-            # Video bitrate in bits/second for GStreamer
-            video_bitrate_bps = self._videoBitrate * 1000
-
             capture_backend = self._capture_backend_preference
             logger.info(f"Using {capture_backend} for video capture")
             
-            start_command = (
-                "GST_VAAPI_ALL_DRIVERS=1 GST_PLUGIN_PATH={} gst-launch-1.0 -e -vvv".format(
-                    str(GSTPLUGINSPATH)
-                )
-            )
-            
-            # Video pipeline using pipewiresrc (from working script)
-            # Using rtmpsink instead of rtmp2sink, simpler vaapih264enc config
-            
             requested_fps = self._framerate
             effective_fps = self._effective_fps_override or requested_fps
             if effective_fps != requested_fps:
@@ -585,74 +908,15 @@ class Plugin:
                     f"[stream:{self._stream_session_id}] Using recovery framerate {effective_fps}fps (requested {requested_fps}fps)"
                 )
 
-            encoder = "vaapih264enc"
-            encoder_opts = f"bitrate={self._videoBitrate}"
-            if self._keyframeInterval > 0:
-                encoder_opts += f" keyframe-period={self._keyframeInterval}"
-            if self._bframes > 0:
-                encoder_opts += f" max-bframes={self._bframes}"
-
-            # After repeated RTMP disconnects, switch to software encoder for safer timestamps.
-            if self._force_software_encoder or not _gst_has_element("vaapih264enc"):
-                encoder = "x264enc" if _gst_has_element("x264enc") else "vaapih264enc"
-                if encoder == "x264enc":
-                    keyint = self._keyframeInterval if self._keyframeInterval > 0 else effective_fps
-                    encoder_opts = (
-                        f"bitrate={self._videoBitrate} tune=zerolatency speed-preset=veryfast "
-                        f"key-int-max={max(1, keyint)} bframes=0"
-                    )
-
+            encoder, encoder_opts, pipeline_template = Plugin._pipeline_template(self, effective_fps, capture_backend)
             logger.info(
                 f"[stream:{self._stream_session_id}] encoder={encoder} options={encoder_opts}"
             )
             logger.info(f"Framerate: {effective_fps} fps")
 
-            # Build framerate caps
-            framerate_caps = f"video/x-raw,framerate={effective_fps}/1"
-            
-            video_source = "pipewiresrc do-timestamp=true"
-            if capture_backend == "ximagesrc":
-                video_source = "ximagesrc use-damage=0 show-pointer=false do-timestamp=true"
-
-            if scale_caps:
-                video_pipeline = (
-                    f"{video_source} ! "
-                    f"videoconvert ! videoscale ! videorate ! {scale_caps},framerate={effective_fps}/1 ! "
-                    f"queue max-size-buffers=120 max-size-bytes=0 max-size-time=0 ! "
-                    f"{encoder} {encoder_opts} ! "
-                    f"h264parse config-interval=1 ! "
-                    f"queue max-size-buffers=120 max-size-bytes=0 max-size-time=0 ! "
-                    f"{'h264timestamper ! ' if _gst_has_element('h264timestamper') else ''}"
-                    f"flvmux name=mux streamable=true "
-                    f"{'enforce-increasing-timestamps=true ' if _gst_element_has_property('flvmux', 'enforce-increasing-timestamps') else ''}"
-                    f"{'skip-backwards-streams=true ' if _gst_element_has_property('flvmux', 'skip-backwards-streams') else ''}"
-                    f"! rtmpsink location=\"{rtmp_full_url}\" sync=false async=false"
-                )
-            else:
-                video_pipeline = (
-                    f"{video_source} ! "
-                    f"videoconvert ! videorate ! {framerate_caps} ! "
-                    f"queue max-size-buffers=120 max-size-bytes=0 max-size-time=0 ! "
-                    f"{encoder} {encoder_opts} ! "
-                    f"h264parse config-interval=1 ! "
-                    f"queue max-size-buffers=120 max-size-bytes=0 max-size-time=0 ! "
-                    f"{'h264timestamper ! ' if _gst_has_element('h264timestamper') else ''}"
-                    f"flvmux name=mux streamable=true "
-                    f"{'enforce-increasing-timestamps=true ' if _gst_element_has_property('flvmux', 'enforce-increasing-timestamps') else ''}"
-                    f"{'skip-backwards-streams=true ' if _gst_element_has_property('flvmux', 'skip-backwards-streams') else ''}"
-                    f"! rtmpsink location=\"{rtmp_full_url}\" sync=false async=false"
-                )
-
-            cmd = f"{start_command} {video_pipeline}"
-
             # Setup audio sink
-            env = os.environ.copy()
-            env.pop('LD_LIBRARY_PATH', None)
-            env.pop('LD_PRELOAD', None)
-            deckyStreamingSinkExists = subprocess.run(
-                f"pactl list sinks | grep '{self._deckySinkModuleName}'", 
-                shell=True, env=env
-            ).returncode == 0
+            sinks = await Plugin._pactl_async(self, ["list", "short", "sinks"])
+            deckyStreamingSinkExists = any(self._deckySinkModuleName in line for line in sinks.splitlines())
 
             if deckyStreamingSinkExists:
                 logger.info(f"{self._deckySinkModuleName} already exists, rebuilding sink for safety")
@@ -660,31 +924,34 @@ class Plugin:
 
             await Plugin.create_decky_pa_sink(self)
 
-            # Audio pipeline - AAC encoded for RTMP
-            audio_bitrate_bps = self._audioBitrate * 1000
-            cmd = (
-                cmd
-                + f' pulsesrc device="{self._deckySinkModuleName}.monitor" ! '
-                + f'audio/x-raw,channels=2 ! audioconvert ! '
-                + f'avenc_aac bitrate={audio_bitrate_bps} ! '
-                + f'mux.'
-            )
+            cmd = pipeline_template.replace(PIPELINE_URL_PLACEHOLDER, rtmp_full_url)
 
             # Start the streaming process (use plugin bin for LD_LIBRARY_PATH so bundled librtmp is found)
-            # start_new_session=True so we can kill the whole process group on timeout (shell + gst-launch)
-            redacted_cmd = cmd.replace(rtmp_full_url, f"{safe_url['raw']}/<redacted-key>")
+            # start_new_session=True so we can kill the whole process group on timeout
+            argv = ["gst-launch-1.0", "-e", "-vvv", *shlex.split(cmd)]
+            # Redact before joining: shlex quoting could split the key and defeat a later replace
+            redacted_cmd = shlex.join(
+                arg.replace(rtmp_full_url, f"{safe_url['raw']}/<redacted-key>") for arg in argv
+            )
             logger.info(f"[stream:{self._stream_session_id}] Command: {redacted_cmd}")
-            env = _streaming_env()
+            env = {**_streaming_env(), "GST_VAAPI_ALL_DRIVERS": "1"}
             logger.info(
                 f"[stream:{self._stream_session_id}] env summary: LD_LIBRARY_PATH={env.get('LD_LIBRARY_PATH','')} GST_PLUGIN_PATH={env.get('GST_PLUGIN_PATH','')}"
             )
+            std_err_file.flush()
+            stderr_offset = std_err_file_path.stat().st_size
+            self._last_stderr_error = ""
+            Plugin._stop_stderr_pump(self)
             self._streaming_process = subprocess.Popen(
-                cmd, shell=True, stdout=std_out_file, stderr=std_err_file, env=env,
+                argv, stdout=std_out_file, stderr=std_err_file, env=env,
                 start_new_session=True,
             )
             logger.info(
                 f"[stream:{self._stream_session_id}] gst subprocess spawned pid={self._streaming_process.pid}"
             )
+            self._stderr_pump_task = asyncio.get_event_loop().create_task(
+                Plugin._stderr_pump(self, self._streaming_process, stderr_offset)
+            )
             
             # Wait a moment and check if process is still running
             await asyncio.sleep(1)
@@ -696,11 +963,10 @@ class Plugin:
                 self._stream_error = True
                 try:
                     std_err_file.flush()
-                    with open(std_err_file_path, 'r') as f:
-                        stderr_content = f.read()
-                        self._last_error_message = self._friendly_error_from_stderr(stderr_content)
-                        if stderr_content and not self._last_error_message:
-                            logger.error(f"GStreamer stderr: {stderr_content[:2000]}")
+                    stderr_content = _tail(std_err_file_path)
+                    self._last_error_message = self._friendly_error_from_stderr(stderr_content)
+                    if stderr_content and not self._last_error_message:
+                        logger.error(f"GStreamer stderr: {stderr_content[-2000:]}")
                 except Exception as read_err:
                     self._last_error_message = "Stream ended unexpectedly (see decky-streamer-std-err.log)"
                     logger.error(f"Could not read stderr: {read_err}")
@@ -716,12 +982,11 @@ class Plugin:
                 self._stream_error = True
                 try:
                     std_err_file.flush()
-                    with open(std_err_file_path, 'r') as f:
-                        stderr_content = f.read()
-                        _parse_err = getattr(Plugin, "_friendly_error_from_stderr")
-                        self._last_error_message = _parse_err(stderr_content) or f"Stream ended unexpectedly (exit code: {exit_code})"
-                        if stderr_content:
-                            logger.error(f"GStreamer stderr: {stderr_content[:2000]}")
+                    stderr_content = _tail(std_err_file_path)
+                    _parse_err = getattr(Plugin, "_friendly_error_from_stderr")
+                    self._last_error_message = _parse_err(stderr_content) or f"Stream ended unexpectedly (exit code: {exit_code})"
+                    if stderr_content:
+                        logger.error(f"GStreamer stderr: {stderr_content[-2000:]}")
                 except Exception as read_err:
                     self._last_error_message = f"Stream ended unexpectedly (exit code: {exit_code})"
                     logger.error(f"Could not read stderr: {read_err}")
@@ -747,6 +1012,7 @@ class Plugin:
     async def stop_streaming(self):
         """Stop the streaming process"""
         logger.info("Stopping stream")
+        Plugin._wake_watchdog(self)
         self._user_requested_stop = True
         self._recovery_pending = False
         if self._streaming_process is None and self._reconnect_active:
@@ -770,7 +1036,8 @@ class Plugin:
         self._last_rtmp_disconnect_at = 0.0
         self._force_software_encoder = False
         self._effective_fps_override = 0
-        proc.send_signal(signal.SIGINT)
+        Plugin._stop_stderr_pump(self)
+        signal_process_group(proc, signal.SIGINT)
         logger.info("SIGINT sent. Waiting...")
         
         try:
@@ -778,14 +1045,10 @@ class Plugin:
         except (subprocess.TimeoutExpired, Exception):
             logger.warn("Could not interrupt gstreamer, killing instead")
             try:
-                proc.terminate()
+                signal_process_group(proc, signal.SIGTERM)
                 proc.wait(timeout=3)
             except (subprocess.TimeoutExpired, Exception):
-                try:
-                    pgid = os.getpgid(proc.pid)
-                    os.killpg(pgid, signal.SIGKILL)
-                except (ProcessLookupError, OSError):
-                    pass
+                signal_process_group(proc, signal.SIGKILL)
                 try:
                     proc.wait(timeout=2)
                 except subprocess.TimeoutExpired:
@@ -851,7 +1114,10 @@ class Plugin:
                         self._last_error_message = "Stream ended after repeated capture failures"
                 else:
                     self._stream_error = True
-                    self._last_error_message = f"Stream ended unexpectedly (exit code: {exit_code})"
+                    if self._last_stderr_error:
+                        self._last_error_message = f"Stream ended unexpectedly: {self._last_stderr_error}"
+                    else:
+                        self._last_error_message = f"Stream ended unexpectedly (exit code: {exit_code})"
             
             # Clean up
             self._streaming_process = None
@@ -871,6 +1137,14 @@ class Plugin:
             "duration": await Plugin.get_stream_duration(self) if is_active else 0
         }
 
+    async def clear_rtmp_cache(self):
+        """Forget the cached rtmpsink availability so the next start re-checks it"""
+        clear_rtmpsink_cache()
+
+    async def clear_display_cache(self):
+        """Forget the cached X11 display listing so the next start re-probes it"""
+        clear_display_cache()
+
     async def clear_stream_error(self):
         """Clear stream error state"""
         self._stream_error = False
@@ -883,82 +1157,108 @@ class Plugin:
         return int(time.time() - self._stream_start_time)
 
     # Audio sink management
+    async def _run_pa(self, fn, *args):
+        """Run a blocking PulseAudio helper on the single pactl thread, keeping calls in order."""
+        return await asyncio.get_event_loop().run_in_executor(self._pa_executor, fn, *args)
+
+    async def _pactl_async(self, args):
+        return await Plugin._run_pa(self, _pactl, args)
+
     async def create_decky_pa_sink(self):
         logger.debug("Creating audio pipeline")
-        audio_device_output = get_cmd_output("pactl get-default-sink", log=False)
+        audio_device_output = (await Plugin._pactl_async(self, ["get-default-sink"])).strip()
 
-        get_cmd_output(f"pactl load-module module-null-sink sink_name={self._deckySinkModuleName}")
-        get_cmd_output(f"pactl load-module module-loopback source={audio_device_output}.monitor sink={self._deckySinkModuleName}")
+        await Plugin._pactl_async(self, ["load-module", "module-null-sink", f"sink_name={self._deckySinkModuleName}"])
+        await Plugin._pactl_async(self, ["load-module", "module-loopback", f"source={audio_device_output}.monitor", f"sink={self._deckySinkModuleName}"])
 
         if await Plugin.is_mic_enabled(self):
-            await Plugin.attach_mic(self)
+            await Plugin.attach_mic(self, default_sink=audio_device_output)
 
     async def cleanup_decky_pa_sink(self):
-        unload_pa_modules("Echo-Cancelled")
-        unload_pa_modules(f"{self._deckySinkModuleName}")
+        await Plugin._run_pa(self, unload_pa_modules, "Echo-Cancelled")
+        await Plugin._run_pa(self, unload_pa_modules, f"{self._deckySinkModuleName}")
 
     # Microphone management
     async def get_default_mic(self):
-        return get_cmd_output("pactl get-default-source")
+        return (await Plugin._pactl_async(self, ["get-default-source"])).strip()
 
     async def is_mic_enabled(self):
+        await Plugin._ensure_loaded(self)
         return self._micEnabled
 
     async def is_mic_attached(self):
-        env = os.environ.copy()
-        env.pop('LD_LIBRARY_PATH', None)
-        env.pop('LD_PRELOAD', None)
-        is_attached = subprocess.run("pactl list modules | grep 'Echo-Cancelled'", shell=True, env=env).returncode == 0
-        return is_attached
+        modules = await Plugin._pactl_async(self, ["list", "short", "modules"])
+        return any("Echo-Cancelled" in line for line in modules.splitlines())
 
-    async def attach_mic(self):
+    async def attach_mic(self, default_sink=None):
         logger.debug(f"Attaching Microphone {self._echoCancelledMicName}")
 
         if self._micSource == "NA":
             self._micSource = await Plugin.get_default_mic(self)
 
         if await Plugin.enhanced_noise_binary_exists(self):
-            get_cmd_output(f"pactl load-module module-null-sink sink_name={self._echoCancelledMicName} rate=48000")
-            get_cmd_output(f"pactl load-module module-ladspa-sink sink_name={self._echoCancelledMicName}_raw_in sink_master={self._echoCancelledMicName} label=noise_suppressor_mono plugin={self._optional_denoise_binary_path} control={self._noiseReductionPercent},20,0,0,0")
-            get_cmd_output(f"pactl load-module module-loopback source={self._micSource} sink={self._echoCancelledMicName}_raw_in channels=1 source_dont_move=true sink_dont_move=true")
-            get_cmd_output(f"pactl set-source-volume {self._echoCancelledMicName}.monitor {self._micGain}db")
-            get_cmd_output(f"pactl load-module module-loopback source={self._echoCancelledMicName}.monitor sink={self._deckySinkModuleName}")
+            await Plugin._pactl_async(self, ["load-module", "module-null-sink", f"sink_name={self._echoCancelledMicName}", "rate=48000"])
+            await Plugin._pactl_async(self, [
+                "load-module", "module-ladspa-sink",
+                f"sink_name={self._echoCancelledMicName}_raw_in", f"sink_master={self._echoCancelledMicName}",
+                "label=noise_suppressor_mono", f"plugin={self._optional_denoise_binary_path}",
+                f"control={self._noiseReductionPercent},20,0,0,0",
+            ])
+            await Plugin._pactl_async(self, [
+                "load-module", "module-loopback", f"source={self._micSource}", f"sink={self._echoCancelledMicName}_raw_in",
+                "channels=1", "source_dont_move=true", "sink_dont_move=true",
+            ])
+            await Plugin._pactl_async(self, ["set-source-volume", f"{self._echoCancelledMicName}.monitor", f"{self._micGain}db"])
+            await Plugin._pactl_async(self, ["load-module", "module-loopback", f"source={self._echoCancelledMicName}.monitor", f"sink={self._deckySinkModuleName}"])
         else:
-            audio_device_output = get_cmd_output("pactl get-default-sink")
-            get_cmd_output(f"pactl load-module module-echo-cancel use_master_format=1 source_master={self._micSource} sink_master={audio_device_output} source_name={self._echoCancelledMicName} sink_name={self._echoCancelledAudioName} aec_method='webrtc' aec_args='analog_gain_control=0 digital_gain_control=1'")
-            get_cmd_output(f"pactl set-source-volume Echo-Cancelled-Mic {self._micGain}db")
-            get_cmd_output(f"pactl load-module module-loopback source={self._echoCancelledMicName} sink={self._deckySinkModuleName}")
-            get_cmd_output(f"pactl load-module module-loopback source={self._echoCancelledAudioName}.monitor sink={self._deckySinkModuleName}")
+            # Reuse the sink looked up by create_decky_pa_sink to save a pactl round trip
+            audio_device_output = default_sink or (await Plugin._pactl_async(self, ["get-default-sink"])).strip()
+            await Plugin._pactl_async(self, [
+                "load-module", "module-echo-cancel", "use_master_format=1",
+                f"source_master={self._micSource}", f"sink_master={audio_device_output}",
+                f"source_name={self._echoCancelledMicName}", f"sink_name={self._echoCancelledAudioName}",
+                "aec_method='webrtc'", "aec_args='analog_gain_control=0 digital_gain_control=1'",
+            ])
+            await Plugin._pactl_async(self, ["set-source-volume", "Echo-Cancelled-Mic", f"{self._micGain}db"])
+            await Plugin._pactl_async(self, ["load-module", "module-loopback", f"source={self._echoCancelledMicName}", f"sink={self._deckySinkModuleName}"])
+            await Plugin._pactl_async(self, ["load-module", "module-loopback", f"source={self._echoCancelledAudioName}.monitor", f"sink={self._deckySinkModuleName}"])
 
     async def detach_mic(self):
         logger.debug(f"Detaching Microphone {self._echoCancelledMicName}")
-        unload_pa_modules("Echo-Cancelled")
+        await Plugin._run_pa(self, unload_pa_modules, "Echo-Cancelled")
 
     async def enable_microphone(self):
+        await Plugin._ensure_loaded(self)
         logger.debug("Enable microphone")
         if await Plugin.is_streaming(self):
             if not await Plugin.is_mic_attached(self):
                 await Plugin.attach_mic(self)
         self._micEnabled = True
-        await Plugin.saveConfig(self)
+        Plugin._schedule_save(self)
 
     async def disable_microphone(self):
+        await Plugin._ensure_loaded(self)
         logger.debug("Disable microphone")
         if await Plugin.is_streaming(self):
             if await Plugin.is_mic_attached(self):
                 await Plugin.detach_mic(self)
         self._micEnabled = False
-        await Plugin.saveConfig(self)
+        Plugin._schedule_save(self)
 
     async def get_mic_gain(self):
+        await Plugin._ensure_loaded(self)
         return self._micGain
 
     async def update_mic_gain(self, new_gain: float):
-        self._micGain = float(new_gain)
+        await Plugin._ensure_loaded(self)
+        new_gain = float(new_gain)
+        if new_gain == self._micGain:
+            return
+        self._micGain = new_gain
         if await Plugin.is_streaming(self):
             if await Plugin.is_mic_attached(self):
-                get_cmd_output(f"pactl set-source-volume Echo-Cancelled-Mic {self._micGain}db")
-        await Plugin.saveConfig(self)
+                await Plugin._pactl_async(self, ["set-source-volume", "Echo-Cancelled-Mic", f"{self._micGain}db"])
+        Plugin._schedule_save(self)
 
     async def enhanced_noise_binary_exists(self):
         # Check bundled path first, then legacy user-data path
@@ -971,22 +1271,28 @@ class Plugin:
         return False
 
     async def get_noise_reduction_percent(self):
+        await Plugin._ensure_loaded(self)
         return self._noiseReductionPercent
 
     async def update_noise_reduction_percent(self, new_percent: int):
-        self._noiseReductionPercent = int(new_percent)
+        await Plugin._ensure_loaded(self)
+        new_percent = _as_int(new_percent)
+        if new_percent == self._noiseReductionPercent:
+            return
+        self._noiseReductionPercent = new_percent
         if await Plugin.is_streaming(self):
             if await Plugin.is_mic_enabled(self):
                 await Plugin.detach_mic(self)
                 await Plugin.attach_mic(self)
-        await Plugin.saveConfig(self)
+        Plugin._schedule_save(self)
 
     async def get_mic_source(self):
         return self._micSource
 
     async def get_mic_sources(self):
         import json
-        raw_sources = get_cmd_output("pactl list short sources | awk '{print $2}'", log=False).split("\n")
+        sources = await Plugin._pactl_async(self, ["list", "short", "sources"])
+        raw_sources = [line.split("\t")[1] for line in sources.splitlines() if "\t" in line]
         default_source = await Plugin.get_default_mic(self)
         sources_json = [{"data": f"{default_source}", "label": "Default Mic"}]
         for source in raw_sources:
@@ -1004,94 +1310,172 @@ class Plugin:
 
     # RTMP Settings
     async def get_platform(self):
+        await Plugin._ensure_loaded(self)
         return self._platform
 
     async def set_platform(self, platform: str):
+        await Plugin._ensure_loaded(self)
         logger.debug(f"Setting platform: {platform}")
+        if platform == self._platform:
+            return
         self._platform = platform
-        await Plugin.saveConfig(self)
+        Plugin._recompute_rtmp(self)
+        Plugin._schedule_save(self)
 
     async def get_rtmp_url(self):
         """Get the effective RTMP URL based on platform"""
+        await Plugin._ensure_loaded(self)
+        return self._effective_rtmp_url
+
+    def _recompute_rtmp(self):
+        """Refresh _effective_rtmp_url; call whenever _platform or _customRtmpUrl changes."""
         if self._platform == "custom":
-            return self._customRtmpUrl
-        return self._platform_urls.get(self._platform, "")
+            self._effective_rtmp_url = self._customRtmpUrl
+        else:
+            self._effective_rtmp_url = PLATFORM_URLS.get(self._platform, "")
 
     async def set_rtmp_url(self, rtmp_url: str):
+        await Plugin._ensure_loaded(self)
         # This is used when switching platforms to update the effective URL
-        if self._platform == "custom":
-            self._customRtmpUrl = rtmp_url
-        await Plugin.saveConfig(self)
+        if self._platform != "custom" or rtmp_url == self._customRtmpUrl:
+            return
+        self._customRtmpUrl = rtmp_url
+        Plugin._recompute_rtmp(self)
+        Plugin._schedule_save(self)
 
     async def get_custom_rtmp_url(self):
+        await Plugin._ensure_loaded(self)
         return self._customRtmpUrl
 
     async def set_custom_rtmp_url(self, rtmp_url: str):
+        await Plugin._ensure_loaded(self)
+        if rtmp_url == self._customRtmpUrl:
+            return
         self._customRtmpUrl = rtmp_url
-        await Plugin.saveConfig(self)
+        Plugin._recompute_rtmp(self)
+        Plugin._schedule_save(self)
 
     async def get_stream_key(self):
+        await Plugin._ensure_loaded(self)
         # Return masked version for security
-        if self._streamKey:
-            return "*" * 8
-        return ""
+        return MASKED_STREAM_KEY if self._streamKey else ""
 
     async def set_stream_key(self, stream_key: str):
+        await Plugin._ensure_loaded(self)
+        if stream_key == self._streamKey:
+            return
         self._streamKey = stream_key
-        await Plugin.saveConfig(self)
+        Plugin._schedule_save(self)
 
     async def get_video_bitrate(self):
+        await Plugin._ensure_loaded(self)
         return self._videoBitrate
 
     async def set_video_bitrate(self, bitrate: int):
-        self._videoBitrate = int(bitrate)
-        await Plugin.saveConfig(self)
+        await Plugin._ensure_loaded(self)
+        bitrate = _as_int(bitrate)
+        if bitrate == self._videoBitrate:
+            return
+        self._videoBitrate = bitrate
+        Plugin._schedule_save(self)
 
     async def get_audio_bitrate(self):
+        await Plugin._ensure_loaded(self)
         return self._audioBitrate
 
     async def set_audio_bitrate(self, bitrate: int):
-        self._audioBitrate = int(bitrate)
-        await Plugin.saveConfig(self)
+        await Plugin._ensure_loaded(self)
+        bitrate = _as_int(bitrate)
+        if bitrate == self._audioBitrate:
+            return
+        self._audioBitrate = bitrate
+        Plugin._schedule_save(self)
 
     async def get_resolution(self):
+        await Plugin._ensure_loaded(self)
         return self._resolution
 
     async def set_resolution(self, resolution: str):
+        await Plugin._ensure_loaded(self)
+        if resolution == self._resolution:
+            return
         self._resolution = resolution
-        await Plugin.saveConfig(self)
+        Plugin._schedule_save(self)
 
     async def get_detected_resolution(self):
-        """Get the current display resolution"""
+        """Get the current display resolution, cached briefly since the UI polls it"""
+        cached_at, cached = self._detected_resolution_cache
+        if cached is not None and time.monotonic() - cached_at < DETECTED_RESOLUTION_TTL:
+            return cached
         res = detect_display_resolution()
-        return f"{res['width']}x{res['height']}"
+        cached = f"{res['width']}x{res['height']}"
+        self._detected_resolution_cache = (time.monotonic(), cached)
+        return cached
 
     async def get_framerate(self):
+        await Plugin._ensure_loaded(self)
         return self._framerate
 
     async def set_framerate(self, framerate: int):
-        self._framerate = int(framerate)
-        await Plugin.saveConfig(self)
+        await Plugin._ensure_loaded(self)
+        framerate = _as_int(framerate)
+        if framerate == self._framerate:
+            return
+        self._framerate = framerate
+        Plugin._schedule_save(self)
 
     async def get_keyframe_interval(self):
+        await Plugin._ensure_loaded(self)
         return self._keyframeInterval
 
     async def set_keyframe_interval(self, interval: int):
-        self._keyframeInterval = int(interval)
-        await Plugin.saveConfig(self)
+        await Plugin._ensure_loaded(self)
+        interval = _as_int(interval)
+        if interval == self._keyframeInterval:
+            return
+        self._keyframeInterval = interval
+        Plugin._schedule_save(self)
 
     async def get_bframes(self):
+        await Plugin._ensure_loaded(self)
         return self._bframes
 
     async def set_bframes(self, bframes: int):
-        self._bframes = int(bframes)
-        await Plugin.saveConfig(self)
+        await Plugin._ensure_loaded(self)
+        bframes = _as_int(bframes)
+        if bframes == self._bframes:
+            return
+        self._bframes = bframes
+        Plugin._schedule_save(self)
 
     # Config management
+    async def _ensure_loaded(self):
+        """Wait for the background loadConfig started in _main, if it is still running."""
+        if self._load_task is not None and not self._load_task.done():
+            await self._load_task
+
+    def _schedule_save(self):
+        """Coalesce bursts of setter calls (e.g. slider drags) into one saveConfig after a quiet period."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+        loop = asyncio.get_event_loop()
+        self._save_handle = loop.call_later(SAVE_DEBOUNCE_SECONDS, lambda: loop.create_task(Plugin._flush_save(self)))
+
+    async def _flush_save(self):
+        """Run a pending debounced save now, if there is one."""
+        if self._save_handle is None:
+            return
+        self._save_handle.cancel()
+        self._save_handle = None
+        await Plugin.saveConfig(self)
+
     async def loadConfig(self):
         logger.debug("Loading settings")
-        self._settings = SettingsManager(name="decky-streamer-settings", settings_directory=settingsDir)
-        self._settings.read()
+        await Plugin._flush_save(self)
+        # Wait out any save still writing on its worker thread so the read sees the new file
+        async with self._save_lock:
+            self._settings = SettingsManager(name="decky-streamer-settings", settings_directory=settingsDir, logger=logger)
+            await self._settings.read_async()
 
         self._platform = self._settings.getSetting("platform", "twitch")
         self._customRtmpUrl = self._settings.getSetting("custom_rtmp_url", "")
@@ -1105,29 +1489,42 @@ class Plugin:
         self._micEnabled = self._settings.getSetting("mic_enabled", False)
         self._micGain = self._settings.getSetting("mic_gain", 13.0)
         self._noiseReductionPercent = self._settings.getSetting("noise_reduction_percent", 50)
+        Plugin._recompute_rtmp(self)
 
-        await Plugin.saveConfig(self)
+        # Only write back when a key was missing and filled with its default, or a legacy file was migrated
+        if self._settings.defaults_applied or self._settings.dirty:
+            await Plugin.saveConfig(self)
         return
 
     async def saveConfig(self):
-        self._settings.setSetting("platform", self._platform)
-        self._settings.setSetting("custom_rtmp_url", self._customRtmpUrl)
-        self._settings.setSetting("stream_key", self._streamKey)
-        self._settings.setSetting("video_bitrate", self._videoBitrate)
-        self._settings.setSetting("audio_bitrate", self._audioBitrate)
-        self._settings.setSetting("resolution", self._resolution)
-        self._settings.setSetting("framerate", self._framerate)
-        self._settings.setSetting("keyframe_interval", self._keyframeInterval)
-        self._settings.setSetting("bframes", self._bframes)
-        self._settings.setSetting("mic_enabled", self._micEnabled)
-        self._settings.setSetting("mic_gain", self._micGain)
-        self._settings.setSetting("noise_reduction_percent", self._noiseReductionPercent)
+        # Writes run on a worker thread; serialize them so two saves never overlap
+        async with self._save_lock:
+            self._settings.update({
+                "platform": self._platform,
+                "custom_rtmp_url": self._customRtmpUrl,
+                "stream_key": self._streamKey,
+                "video_bitrate": self._videoBitrate,
+                "audio_bitrate": self._audioBitrate,
+                "resolution": self._resolution,
+                "framerate": self._framerate,
+                "keyframe_interval": self._keyframeInterval,
+                "bframes": self._bframes,
+                "mic_enabled": self._micEnabled,
+                "mic_gain": self._micGain,
+                "noise_reduction_percent": self._noiseReductionPercent,
+            })
+            await self._settings.write_async()
         return
 
     async def _main(self):
         loop = asyncio.get_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="decky-streamer")
+        self._pa_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pactl")
+        self._watchdog_wake = asyncio.Event()
+        self._save_lock = asyncio.Lock()
         self._watchdog_task = loop.create_task(Plugin.watchdog(self))
-        await Plugin.loadConfig(self)
+        # Load settings in the background; getters/setters wait on it via _ensure_loaded
+        self._load_task = loop.create_task(Plugin.loadConfig(self))
         return
 
     async def _unload(self):
@@ -1135,5 +1532,27 @@ class Plugin:
         if await Plugin.is_streaming(self):
             logger.info("Cleaning up")
             await Plugin.stop_streaming(self)
-        await Plugin.saveConfig(self)
+        await Plugin._ensure_loaded(self)
+        # Write a pending debounced save now; otherwise only write if settings are still dirty
+        await Plugin._flush_save(self)
+        if self._settings is not None and self._settings.dirty:
+            async with self._save_lock:
+                await self._settings.write_async()
+        # Stop background tasks before the pools they submit work to are shut down
+        tasks = [t for t in (self._watchdog_task, self._stderr_pump_task) if t is not None]
+        self._watchdog_task = None
+        Plugin._stop_stderr_pump(self)
+        for task in tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                # A task that already died must not keep the pools below from shutting down
+                logger.error(f"Background task failed before unload: {e}")
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._pa_executor is not None:
+            self._pa_executor.shutdown(wait=False)
         return
@@ -1,41 +1,155 @@
+import asyncio
 import json
+import logging
 import os
+import tempfile
 from pathlib import Path
 
+_logger = logging.getLogger(__name__)
+
+# orjson is optional; the settings file is compact JSON either way
+try:
+    import orjson
+
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    _json_loads = json.loads
+
+# msgpack is optional too; when available settings are stored as <name>.msgpack and an
+# existing <name>.json is migrated on first read
+try:
+    import msgpack
+
+    _EXTENSION = "msgpack"
+    _dumps = msgpack.packb
+    _loads = msgpack.unpackb
+except ImportError:
+    _EXTENSION = "json"
+    _dumps = _json_dumps
+    _loads = _json_loads
+
 
 class SettingsManager:
-    def __init__(self, name: str, settings_directory: str):
+    __slots__ = (
+        "name",
+        "logger",
+        "settings_directory",
+        "settings_file",
+        "legacy_settings_file",
+        "settings",
+        "dirty",
+        "defaults_applied",
+        "_version",
+        "_written_version",
+        "_cached_bytes",
+        "_cached_version",
+    )
+
+    def __init__(self, name: str, settings_directory: str, logger: logging.Logger = None):
         self.name = name
+        self.logger = logger or _logger
         self.settings_directory = settings_directory
-        self.settings_file = os.path.join(settings_directory, f"{name}.json")
+        self.settings_file = os.path.join(settings_directory, f"{name}.{_EXTENSION}")
+        self.legacy_settings_file = os.path.join(settings_directory, f"{name}.json")
         self.settings = {}
+        self.dirty = False
+        # Set when getSetting had to fall back to a default since the last read()
+        self.defaults_applied = False
+        # Bumped on every change; write() compares it against the version on disk and the
+        # version of the cached encoded buffer to skip redundant writes and re-encodes
+        self._version = 0
+        self._written_version = None
+        self._cached_bytes = b""
+        self._cached_version = None
 
     def read(self):
-        """Read settings from the JSON file"""
+        """Read settings from the settings file, migrating a legacy JSON file if needed"""
+        self.defaults_applied = False
         try:
             if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r') as f:
-                    self.settings = json.load(f)
+                with open(self.settings_file, 'rb') as f:
+                    self.settings = _loads(f.read())
+                self._version += 1
+                self._written_version = self._version
+            elif self.legacy_settings_file != self.settings_file and os.path.exists(self.legacy_settings_file):
+                with open(self.legacy_settings_file, 'rb') as f:
+                    self.settings = _json_loads(f.read())
+                # Leave the version unwritten so the next write() stores it in the new format
+                self._version += 1
+                self.dirty = True
         except Exception as e:
-            print(f"Error reading settings: {e}")
+            self.logger.error(f"Error reading settings: {e}")
             self.settings = {}
         return self.settings
 
     def write(self):
-        """Write settings to the JSON file"""
+        """Write settings to the settings file, unless they match what was last read or written"""
+        if self._version == self._written_version:
+            self.dirty = False
+            return
         try:
+            if self._cached_version != self._version:
+                self._cached_bytes = _dumps(self.settings)
+                self._cached_version = self._version
             # Ensure directory exists
             Path(self.settings_directory).mkdir(parents=True, exist_ok=True)
-            with open(self.settings_file, 'w') as f:
-                json.dump(self.settings, f, indent=2)
+            # Write to a unique temp file and rename over the target so an interrupted save
+            # (suspend, power loss) never leaves a truncated settings file behind
+            fd, tmp_file = tempfile.mkstemp(dir=self.settings_directory, prefix=f".{self.name}.", suffix=".tmp")
+            try:
+                try:
+                    os.fchmod(fd, 0o644)
+                    view = memoryview(self._cached_bytes)
+                    while view:
+                        view = view[os.write(fd, view):]
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                os.replace(tmp_file, self.settings_file)
+            except BaseException:
+                try:
+                    os.unlink(tmp_file)
+                except OSError:
+                    pass
+                raise
+            # Record the version that was encoded, which may lag behind one bumped meanwhile
+            self._written_version = self._cached_version
+            self.dirty = self._version != self._written_version
         except Exception as e:
-            print(f"Error writing settings: {e}")
+            self.logger.error(f"Error writing settings: {e}")
+
+    async def read_async(self):
+        """Read settings on a worker thread so the event loop is not blocked"""
+        return await asyncio.to_thread(self.read)
+
+    async def write_async(self):
+        """Write settings on a worker thread so the event loop is not blocked"""
+        await asyncio.to_thread(self.write)
 
     def getSetting(self, key: str, default=None):
         """Get a setting value by key, returning default if not found"""
-        return self.settings.get(key, default)
+        if key not in self.settings:
+            self.defaults_applied = True
+            return default
+        return self.settings[key]
 
     def setSetting(self, key: str, value):
-        """Set a setting value and save to file"""
+        """Set a setting value; call write() to save it to file"""
+        if key in self.settings and self.settings[key] == value:
+            return
         self.settings[key] = value
-        self.write()
+        self._version += 1
+        self.dirty = True
+
+    def update(self, mapping: dict):
+        """Set several setting values at once; call write() to save them to file"""
+        if all(key in self.settings and self.settings[key] == value for key, value in mapping.items()):
+            return
+        self.settings.update(mapping)
+        self._version += 1
+        self.dirty = True